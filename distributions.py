@@ -6,6 +6,9 @@
 
 import math
 import numpy as np
+from numba import njit, types
+from numba.extending import overload
+from models import model_value
 
 # --------------------------
 # PDF / Likelihood functions
@@ -22,17 +25,92 @@ def log_likelihood_2d(a, b, x_data, y_data, dy_data, model_func):
         x_data (array): observed x values
         y_data (array): observed y values
         dy_data (array): uncertainty of each y point
-        model_func (callable): model function f(x, a, b)
+        model_func (callable): vectorized model function f(x, a, b)
 
     Returns:
-        float: log-likelihood value
+        float: log-likelihood value (-inf if the model is not finite)
+    """
+    x_data = np.asarray(x_data, dtype=float)
+    y_data = np.asarray(y_data, dtype=float)
+    inv_dy2 = 1.0 / np.asarray(dy_data, dtype=float)**2
+    return log_likelihood_2d_precomp(a, b, x_data, y_data, inv_dy2, model_func)
+
+
+def log_likelihood_2d_precomp(a, b, x_data, y_data, inv_dy2, model_func):
+    """
+    Log-likelihood via chi² with precomputed weights 1 / dy².
+    Used inside the MCMC loop, where the data never change: inputs are
+    not converted here, so pass contiguous float64 arrays.
+
+    Parameters:
+        a, b (float): model parameters
+        x_data, y_data (float64 arrays): observed data
+        inv_dy2 (float64 array): precomputed 1 / dy²
+        model_func (callable): vectorized model function f(x, a, b)
+
+    Returns:
+        float: log-likelihood value (-inf if the model is not finite)
+    """
+    # Evaluate the model once on the whole array
+    with np.errstate(invalid="ignore", divide="ignore"):
+        model_y = model_func(x_data, a, b)
+    chi2 = _chi2(model_y, y_data, inv_dy2)
+
+    # Reject parameters outside the model domain (e.g. log of a negative)
+    if not np.isfinite(chi2):
+        return -np.inf
+    return -0.5 * chi2
+
+# Compiled kernels.
+# Only reassociation/contraction are enabled: the nnan/ninf fast-math flags
+# would let LLVM drop the non-finite checks on chi².
+
+@njit(cache=True, fastmath={"reassoc", "contract"})
+def _chi2(model_y, y_data, inv_dy2):
+    """Weighted residual sum in a single pass, without temporary arrays"""
+    chi2 = 0.0
+    for i in range(model_y.size):
+        r = model_y[i] - y_data[i]
+        chi2 += r * r * inv_dy2[i]
+    return chi2
+
+
+@njit(cache=True, fastmath={"reassoc", "contract"})
+def log_likelihood_2d_jit(a, b, x_data, y_data, inv_dy2, model_id):
+    """
+    Compiled chi² log-likelihood for a built-in model.
+    The model is evaluated point by point inside the chi² loop.
+
+    Parameters:
+        a, b (float): model parameters
+        x_data, y_data (float64 arrays): observed data
+        inv_dy2 (float64 array): precomputed 1 / dy²
+        model_id (int): built-in model id (see models.MODEL_IDS)
+
+    Returns:
+        float: log-likelihood value (-inf if the model is not finite)
     """
     chi2 = 0.0
-    for xi, yi, dyi in zip(x_data, y_data, dy_data):
-        model_val = model_func(xi, a, b)
-        chi2 += ((model_val - yi) ** 2) / (dyi ** 2)
+    for i in range(x_data.size):
+        r = model_value(model_id, x_data[i], a, b) - y_data[i]
+        chi2 += r * r * inv_dy2[i]
+
+    if not np.isfinite(chi2):
+        return -np.inf
     return -0.5 * chi2
 
+
+@overload(log_likelihood_2d_precomp)
+def _log_likelihood_2d_precomp_jit(a, b, x_data, y_data, inv_dy2, model_func):
+    """
+    Compiled log_likelihood_2d_precomp for a built-in model id: the MCMC
+    kernels call it with a model callable when run as Python (.py_func)
+    and with an id when compiled, so they take no function argument
+    """
+    if isinstance(model_func, types.Integer):
+        return lambda a, b, x_data, y_data, inv_dy2, model_func: \
+            log_likelihood_2d_jit(a, b, x_data, y_data, inv_dy2, model_func)
+
 # --------------------------
 # Random number generators
 # --------------------------
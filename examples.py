@@ -7,91 +7,91 @@
 # - gaussian_noise: random observational noise
 # Saves: observations, MCMC chain, plots, final results
 
+import io
 import numpy as np
 import os
 from mcmc import mcmc_2d
-from utils import save_chain, plot_trace, plot_histogram, plot_scatter, save_final_results
+from models import linear_model, log_model, quadratic_model, inverse_model
+from utils import save_chain, plot_trace, plot_histogram, plot_scatter, posterior_moments
 
 # -------------------------------
 # Helper function to generate observational data
 # -------------------------------
 
 def generate_observational_data(model_func, x_data, true_a, true_b,
-                                instrument_error, trend_coeff, noise_sigma):
+                                instrument_error, trend_coeff, noise_sigma, rng=None):
     """
     Generate y_data and dy_data with realistic observational errors
+    (rng: np.random.Generator or seed, drawn from np.random if None)
     """
-    # Trend in uncertainty with x
-    trend_error = trend_coeff * x_data
+    if rng is None:
+        # Draw from the global state so np.random.seed() keeps runs reproducible
+        rng = np.random.randint(2**31 - 1)
+    rng = np.random.default_rng(rng)
 
-    # Random Gaussian noise for uncertainty
-    gaussian_noise = np.random.normal(0, noise_sigma, size=len(x_data))
+    # Random Gaussian noise for uncertainty, plus instrument error
+    # and trend with x, accumulated in place
+    dy_data = rng.normal(0, noise_sigma, size=len(x_data))
+    dy_data += instrument_error + trend_coeff * x_data
 
     # Total uncertainty per point (dy must be positive)
-    dy_data = np.abs(instrument_error + trend_error + gaussian_noise)
+    np.abs(dy_data, out=dy_data)
 
     # Observed y with noise proportional to dy
-    y_data = model_func(x_data, true_a, true_b) + np.random.normal(0, dy_data)
+    y_data = rng.normal(0, dy_data)
+    y_data += model_func(x_data, true_a, true_b)
 
     return y_data, dy_data
 
-# -------------------------------
-# Models
-# -------------------------------
-
-def linear_model(x, a, b):
-    return a*x + b
-
-def log_model(x, a, b):
-    return a * np.log(b*x)
-
-def quadratic_model(x, a, b):
-    return a*x + b*x**2
-
-def inverse_model(x, a, b):
-    return a/x + b
-
 # -------------------------------
 # Data for each example
 # -------------------------------
 
 x_linear = np.linspace(0, 10, 20)
 true_a_linear, true_b_linear = 2.0, 1.0
-y_linear, dy_linear = generate_observational_data(
-    linear_model, x_linear, true_a_linear, true_b_linear,
-    instrument_error=0.2, trend_coeff=0.05, noise_sigma=0.05
-)
+errors_linear = dict(instrument_error=0.2, trend_coeff=0.05, noise_sigma=0.05)
 
 x_log = np.linspace(1, 10, 20)
 true_a_log, true_b_log = 1.5, 0.5
-y_log, dy_log = generate_observational_data(
-    log_model, x_log, true_a_log, true_b_log,
-    instrument_error=0.3, trend_coeff=0.02, noise_sigma=0.05
-)
+errors_log = dict(instrument_error=0.3, trend_coeff=0.02, noise_sigma=0.05)
 
 x_quad = np.linspace(0, 5, 20)
 true_a_quad, true_b_quad = 1.0, 0.2
-y_quad, dy_quad = generate_observational_data(
-    quadratic_model, x_quad, true_a_quad, true_b_quad,
-    instrument_error=0.2, trend_coeff=0.05, noise_sigma=0.03
-)
+errors_quad = dict(instrument_error=0.2, trend_coeff=0.05, noise_sigma=0.03)
 
 x_inv = np.linspace(1, 10, 20)
 true_a_inv, true_b_inv = 5.0, 1.0
+errors_inv = dict(instrument_error=0.3, trend_coeff=0.01, noise_sigma=0.02)
+
+# Fixed observations drawn at import (from the global np.random state),
+# for callers passing y/dy to run_example; the runners below instead
+# draw fresh observations from each run's seed
+y_linear, dy_linear = generate_observational_data(
+    linear_model, x_linear, true_a_linear, true_b_linear, **errors_linear)
+y_log, dy_log = generate_observational_data(
+    log_model, x_log, true_a_log, true_b_log, **errors_log)
+y_quad, dy_quad = generate_observational_data(
+    quadratic_model, x_quad, true_a_quad, true_b_quad, **errors_quad)
 y_inv, dy_inv = generate_observational_data(
-    inverse_model, x_inv, true_a_inv, true_b_inv,
-    instrument_error=0.3, trend_coeff=0.01, noise_sigma=0.02
-)
+    inverse_model, x_inv, true_a_inv, true_b_inv, **errors_inv)
 
 # -------------------------------
 # Generic runner for examples
 # -------------------------------
 
-def run_example(x_data, y_data, dy_data, model_func, true_a, true_b, name):
+def run_example(x_data, y_data, dy_data, model_func, true_a, true_b, name,
+                errors=None, seed=None):
     """
     Run a single MCMC example
+    One random generator (seeded with seed, drawn from np.random if None)
+    drives the MCMC sampler and, when y_data/dy_data are None, generates
+    the observations from errors (generate_observational_data settings)
     Saves: observations, chain, plots, final results
     """
+    if seed is None:
+        # Draw from the global state so np.random.seed() keeps runs reproducible
+        seed = np.random.randint(2**31 - 1)
+    rng = np.random.default_rng(seed)
     data_path = f"data/{name}"
     plots_path = f"plots/{name}"
     results_path = f"results/{name}"
@@ -101,17 +101,28 @@ def run_example(x_data, y_data, dy_data, model_func, true_a, true_b, name):
 
     print(f"Running {name} example with variable uncertainty...")
 
+    # Generate observational data (unless given)
+    if y_data is None or dy_data is None:
+        if errors is None:
+            raise ValueError("errors are required to generate y_data/dy_data")
+        y_data, dy_data = generate_observational_data(model_func, x_data, true_a, true_b,
+                                                      rng=rng, **errors)
+
+    # Format the observational data once (reused in final results)
+    buf = io.StringIO()
+    np.savetxt(buf, np.column_stack([x_data, y_data, dy_data]), fmt="%.6f",
+               delimiter="\t", header="x\t y\t dy", comments="")
+    obs_table = buf.getvalue()
+
     # Save observational data
     obs_file = f"{data_path}/observations.txt"
     with open(obs_file, "w") as f:
-        f.write("x\t y\t dy\n")
-        for xi, yi, dyi in zip(x_data, y_data, dy_data):
-            f.write(f"{xi:.4f}\t{yi:.4f}\t{dyi:.4f}\n")
+        f.write(obs_table)
     print(f"Observational data saved in {obs_file}")
 
     # Run MCMC
     chain, loglikes = mcmc_2d(x_data, y_data, dy_data, model_func,
-                               a_init=0.0, b_init=0.0, n_steps=5000, scale=0.1)
+                               a_init=0.0, b_init=0.0, n_steps=5000, scale=0.1, seed=rng)
 
     # Save chain and plots
     save_chain(chain, loglikes, f"{data_path}/chain.npz")
@@ -120,8 +131,7 @@ def run_example(x_data, y_data, dy_data, model_func, true_a, true_b, name):
     plot_scatter(chain, ["a","b"], f"{plots_path}/scatter.png")
 
     # Compute statistics
-    mean_a, mean_b = np.mean(chain[:,0]), np.mean(chain[:,1])
-    std_a, std_b = np.std(chain[:,0]), np.std(chain[:,1])
+    (mean_a, mean_b), (std_a, std_b) = posterior_moments(chain)
     abs_err_a = abs(mean_a - true_a)
     abs_err_b = abs(mean_b - true_b)
     perc_err_a = abs_err_a / true_a * 100
@@ -131,9 +141,7 @@ def run_example(x_data, y_data, dy_data, model_func, true_a, true_b, name):
     result_file = f"{results_path}/final_results.txt"
     with open(result_file, "w") as f:
         f.write("Observational data (x, y, dy):\n")
-        f.write("x\t y\t dy\n")
-        for xi, yi, dyi in zip(x_data, y_data, dy_data):
-            f.write(f"{xi:.4f}\t{yi:.4f}\t{dyi:.4f}\n")
+        f.write(obs_table)
         f.write("\nEstimated parameters vs True values:\n")
         f.write(f"a: {mean_a:.4f} ± {std_a:.4f} (true: {true_a})\n")
         f.write(f"b: {mean_b:.4f} ± {std_b:.4f} (true: {true_b})\n\n")
@@ -157,18 +165,18 @@ def run_example(x_data, y_data, dy_data, model_func, true_a, true_b, name):
 # Specific runners
 # -------------------------------
 
-def run_linear_example():
-    run_example(x_linear, y_linear, dy_linear, linear_model,
-                true_a_linear, true_b_linear, "linear")
+def run_linear_example(seed=None):
+    run_example(x_linear, None, None, linear_model, true_a_linear, true_b_linear,
+                "linear", errors_linear, seed)
 
-def run_log_example():
-    run_example(x_log, y_log, dy_log, log_model,
-                true_a_log, true_b_log, "logarithmic")
+def run_log_example(seed=None):
+    run_example(x_log, None, None, log_model, true_a_log, true_b_log,
+                "logarithmic", errors_log, seed)
 
-def run_quadratic_example():
-    run_example(x_quad, y_quad, dy_quad, quadratic_model,
-                true_a_quad, true_b_quad, "quadratic")
+def run_quadratic_example(seed=None):
+    run_example(x_quad, None, None, quadratic_model, true_a_quad, true_b_quad,
+                "quadratic", errors_quad, seed)
 
-def run_inverse_example():
-    run_example(x_inv, y_inv, dy_inv, inverse_model,
-                true_a_inv, true_b_inv, "inverse")
+def run_inverse_example(seed=None):
+    run_example(x_inv, None, None, inverse_model, true_a_inv, true_b_inv,
+                "inverse", errors_inv, seed)
@@ -1,13 +1,17 @@
 # main.py
 # Entry point to run all MCMC parameter inference examples
 
-import numpy as np
-
-# Set global random seed for reproducibility
-np.random.seed(40)
+from concurrent.futures import ProcessPoolExecutor
 
 from examples import run_linear_example, run_log_example, run_quadratic_example, run_inverse_example
 
+def _run(example):
+    """Run one example in a worker process with its own seed"""
+    name, func, seed = example
+    print(f"\n==== Running {name} example ====")
+    func(seed)  # execute the MCMC example
+    print(f"==== {name} example completed ====\n")
+
 def main():
     # List of examples: (display name, function)
     examples = [
@@ -17,11 +21,15 @@ def main():
         ("Inverse", run_inverse_example)
     ]
 
-    # Run each example sequentially
-    for name, func in examples:
-        print(f"\n==== Running {name} example ====")
-        func()  # execute the MCMC example
-        print(f"==== {name} example completed ====\n")
+    # Examples are independent: run them in parallel, one process each.
+    # Each gets its own seed (40 + index) for reproducible, independent streams.
+    # Workers are forked, which is safe only because this process runs no
+    # numba parallel kernel first (mcmc_2d_pt starts a thread pool that a
+    # fork cannot inherit): use mp_context=multiprocessing.get_context("spawn")
+    # if it ever does.
+    jobs = [(name, func, 40 + i) for i, (name, func) in enumerate(examples)]
+    with ProcessPoolExecutor(max_workers=len(jobs)) as executor:
+        list(executor.map(_run, jobs))
 
 if __name__ == "__main__":
     main()
@@ -2,70 +2,278 @@
 """
 MCMC module for ParamInsight (2D)
 - Metropolis-Hastings with n-1/n-2 memory
+- Parallel tempering variant for multimodal posteriors
+- Compiled (numba) kernels for the built-in models, cached on disk
 - Returns chains for later analysis
 """
 
 import numpy as np
-from distributions import rand_normal, log_likelihood_2d
+from numba import njit, prange
+from distributions import log_likelihood_2d_precomp
+from models import MODEL_IDS
 
 def mcmc_2d(x_data, y_data, dy_data, model_func,
-            a_init, b_init, n_steps=5000, scale=0.1):
+            a_init, b_init, n_steps=5000, scale=0.1, seed=None):
     """
     2-parameter MCMC (a, b) with n-1/n-2 memory.
 
+    The built-in models (models.MODEL_IDS) run in a compiled kernel,
+    cached on disk after the first run; any other callable runs the
+    same kernel as plain Python.
+
     Parameters:
         x_data, y_data, dy_data (arrays): observed data
         model_func (callable): model function f(x, a, b)
         a_init, b_init (float): initial parameter values
         n_steps (int): number of MCMC steps
         scale (float): proposal step scale
+        seed (int or np.random.Generator): random seed or generator
+                                          (drawn from np.random if None)
 
     Returns:
         chain (np.array): shape (n_steps, 2) parameter chain
         loglikes (np.array): corresponding log-likelihoods
     """
-    # Initialize arrays
-    chain = np.zeros((n_steps, 2))
-    loglikes = np.zeros(n_steps)
-    
+    if seed is None:
+        # Draw from the global state so np.random.seed() keeps runs reproducible
+        seed = np.random.randint(2**31 - 1)
+
+    x, y, inv_dy2 = _prepare_data(x_data, y_data, dy_data)
+
+    # Draw all proposal increments and log acceptance uniforms up front
+    rng = np.random.default_rng(seed)
+    noise = rng.standard_normal((n_steps, 2))
+    noise *= scale
+    log_u = _log_uniform(rng, n_steps)
+
+    model_id = MODEL_IDS.get(model_func)
+    if model_id is None:
+        # -inf - -inf is NaN, which rejects the move as intended
+        with np.errstate(invalid="ignore"):
+            return _mcmc_2d_kernel.py_func(model_func, x, y, inv_dy2,
+                                           a_init, b_init, noise, log_u)
+
+    return _mcmc_2d_kernel(model_id, x, y, inv_dy2, float(a_init), float(b_init),
+                           noise, log_u)
+
+
+def _prepare_data(x_data, y_data, dy_data):
+    """
+    Convert the observed data once per run: the sampler only sees
+    contiguous float64 arrays and the chi² weights 1 / dy²
+    """
+    x = np.ascontiguousarray(x_data, dtype=np.float64)
+    y = np.ascontiguousarray(y_data, dtype=np.float64)
+    inv_dy2 = 1.0 / np.ascontiguousarray(dy_data, dtype=np.float64)**2
+    return x, y, inv_dy2
+
+
+def _log_uniform(rng, size):
+    """log(u) for a block of uniforms, computed in place in one buffer"""
+    u = rng.random(size)
+    return np.log(u, out=u)
+
+
+@njit(cache=True)
+def _mcmc_2d_kernel(model, x, y, inv_dy2, a_init, b_init, noise, log_u):
+    """
+    n-1/n-2 memory sampler (see mcmc_2d).
+
+    model is a built-in model id when compiled, or a model callable when
+    run through .py_func (log_likelihood_2d_precomp handles both). noise
+    and log_u hold the pre-drawn proposal increments and log acceptance
+    uniforms for each step.
+    """
+    n_steps = noise.shape[0]
+
+    # One array per parameter: the loop reads plain floats, not chain rows
+    chain_a = np.empty(n_steps)
+    chain_b = np.empty(n_steps)
+    loglikes = np.empty(n_steps)
+
     # Initial step
-    chain[0, 0] = a_init
-    chain[0, 1] = b_init
-    loglikes[0] = log_likelihood_2d(a_init, b_init, x_data, y_data, dy_data, model_func)
-    
+    chain_a[0] = a_init
+    chain_b[0] = b_init
+    loglikes[0] = log_likelihood_2d_precomp(a_init, b_init, x, y, inv_dy2, model)
+
     # Second step (no n-2 memory yet)
-    a_new = a_init + rand_normal(0, scale)
-    b_new = b_init + rand_normal(0, scale)
-    loglike_new = log_likelihood_2d(a_new, b_new, x_data, y_data, dy_data, model_func)
-    
-    alpha = min(1, np.exp(loglike_new - loglikes[0]))
-    if np.random.random() < alpha:
-        chain[1, 0] = a_new
-        chain[1, 1] = b_new
+    a_new = a_init + noise[1, 0]
+    b_new = b_init + noise[1, 1]
+    loglike_new = log_likelihood_2d_precomp(a_new, b_new, x, y, inv_dy2, model)
+
+    # Metropolis-Hastings acceptance in log space: log(u) < logL_new - logL_old
+    # (uphill moves are accepted without reading log(u))
+    delta = loglike_new - loglikes[0]
+    if delta >= 0.0 or log_u[1] < delta:
+        chain_a[1] = a_new
+        chain_b[1] = b_new
         loglikes[1] = loglike_new
     else:
-        chain[1, :] = chain[0, :]
+        chain_a[1] = a_init
+        chain_b[1] = b_init
         loglikes[1] = loglikes[0]
-    
+
     # Subsequent steps with n-1/n-2 memory
     for i in range(2, n_steps):
-        a_prev1, b_prev1 = chain[i-1]
-        a_prev2, b_prev2 = chain[i-2]
-        
+        a_prev1, b_prev1 = chain_a[i-1], chain_b[i-1]
+        a_prev2, b_prev2 = chain_a[i-2], chain_b[i-2]
+
         # Proposal using memory inertia
-        a_prop = a_prev1 + 0.5*(a_prev1 - a_prev2) + rand_normal(0, scale)
-        b_prop = b_prev1 + 0.5*(b_prev1 - b_prev2) + rand_normal(0, scale)
-        
-        loglike_prop = log_likelihood_2d(a_prop, b_prop, x_data, y_data, dy_data, model_func)
-        
+        a_prop = a_prev1 + 0.5*(a_prev1 - a_prev2) + noise[i, 0]
+        b_prop = b_prev1 + 0.5*(b_prev1 - b_prev2) + noise[i, 1]
+
+        loglike_prop = log_likelihood_2d_precomp(a_prop, b_prop, x, y, inv_dy2, model)
+
         # Metropolis-Hastings acceptance
-        alpha = min(1, np.exp(loglike_prop - loglikes[i-1]))
-        if np.random.random() < alpha:
-            chain[i, 0] = a_prop
-            chain[i, 1] = b_prop
+        delta = loglike_prop - loglikes[i-1]
+        if delta >= 0.0 or log_u[i] < delta:
+            chain_a[i] = a_prop
+            chain_b[i] = b_prop
             loglikes[i] = loglike_prop
         else:
-            chain[i, :] = chain[i-1, :]
+            chain_a[i] = a_prev1
+            chain_b[i] = b_prev1
             loglikes[i] = loglikes[i-1]
-    
-    return chain, loglikes
+
+    return np.column_stack((chain_a, chain_b)), loglikes
+
+
+def mcmc_2d_pt(x_data, y_data, dy_data, model_func,
+               a_init, b_init, n_steps=5000, scale=0.1,
+               betas=None, swap_every=100, seed=None):
+    """
+    2-parameter parallel tempering MCMC (a, b) with n-1/n-2 memory.
+
+    K chains sample the tempered likelihoods L^beta_k side by side
+    (one thread per chain for the built-in models). Every swap_every
+    steps, adjacent chains propose to exchange states, so the hot chains
+    carry the cold one across valleys between posterior modes.
+
+    The compiled kernel starts numba's thread pool: forking the process
+    afterwards (e.g. a default ProcessPoolExecutor on Linux) can hang,
+    so use a "spawn" multiprocessing context after calling it.
+
+    Parameters:
+        x_data, y_data, dy_data (arrays): observed data
+        model_func (callable): model function f(x, a, b)
+        a_init, b_init (float): initial parameter values
+        n_steps (int): number of MCMC steps per chain
+        scale (float): proposal step scale at beta = 1
+                       (scale / sqrt(beta) for hotter chains)
+        betas (array): inverse temperatures in (0, 1], betas[0] must be 1
+                       (default: 1 / geomspace(1, 100, 4))
+        swap_every (int): steps between swap proposals (at least 1)
+        seed (int or np.random.Generator): random seed or generator
+                                          (drawn from np.random if None)
+
+    Returns:
+        chain (np.array): shape (n_steps, 2) chain at beta = 1
+        loglikes (np.array): corresponding log-likelihoods
+    """
+    if betas is None:
+        betas = 1.0 / np.geomspace(1.0, 100.0, 4)
+    betas = np.ascontiguousarray(betas, dtype=np.float64)
+    if betas[0] != 1.0:
+        raise ValueError("betas[0] must be 1 (the untempered chain)")
+    if not np.all((betas > 0.0) & (betas <= 1.0)):
+        raise ValueError("betas must be finite and in (0, 1]")
+    if swap_every < 1:
+        raise ValueError("swap_every must be at least 1")
+
+    if seed is None:
+        # Draw from the global state so np.random.seed() keeps runs reproducible
+        seed = np.random.randint(2**31 - 1)
+
+    x, y, inv_dy2 = _prepare_data(x_data, y_data, dy_data)
+
+    # Draw all proposal increments and log uniforms up front
+    n_temps = betas.size
+    n_swaps = (n_steps - 2) // swap_every + 1
+    rng = np.random.default_rng(seed)
+    noise = rng.standard_normal((n_temps, n_steps, 2))
+    noise *= (scale / np.sqrt(betas))[:, None, None]
+    log_u = _log_uniform(rng, (n_temps, n_steps))
+    log_u_swap = _log_uniform(rng, (n_swaps, n_temps - 1))
+
+    model_id = MODEL_IDS.get(model_func)
+    if model_id is None:
+        # -inf - -inf is NaN, which rejects the move as intended
+        with np.errstate(invalid="ignore"):
+            return _mcmc_2d_pt_kernel.py_func(model_func, x, y, inv_dy2,
+                                              a_init, b_init, betas,
+                                              noise, log_u, log_u_swap, swap_every)
+
+    return _mcmc_2d_pt_kernel(model_id, x, y, inv_dy2, float(a_init), float(b_init),
+                              betas, noise, log_u, log_u_swap, int(swap_every))
+
+
+@njit(cache=True, parallel=True)
+def _mcmc_2d_pt_kernel(model, x, y, inv_dy2, a_init, b_init, betas,
+                       noise, log_u, log_u_swap, swap_every):
+    """
+    Parallel tempering sampler (see mcmc_2d_pt and _mcmc_2d_kernel).
+
+    Chains advance independently (prange over temperatures) for
+    swap_every steps, then adjacent pairs attempt a swap of their current
+    state. Momentum restarts after each swap round, as on the first step.
+    loglikes holds the untempered log-likelihood of every chain.
+    """
+    n_temps, n_steps = log_u.shape
+
+    chain_a = np.empty((n_temps, n_steps))
+    chain_b = np.empty((n_temps, n_steps))
+    loglikes = np.empty((n_temps, n_steps))
+
+    # Initial step, shared by all chains
+    loglike_init = log_likelihood_2d_precomp(a_init, b_init, x, y, inv_dy2, model)
+    for k in range(n_temps):
+        chain_a[k, 0] = a_init
+        chain_b[k, 0] = b_init
+        loglikes[k, 0] = loglike_init
+
+    start = 1
+    n_swap = 0
+    while start < n_steps:
+        stop = min(start + swap_every, n_steps)
+
+        # Advance every tempered chain independently
+        for k in prange(n_temps):
+            beta = betas[k]
+            for i in range(start, stop):
+                a_prev1, b_prev1 = chain_a[k, i-1], chain_b[k, i-1]
+                if i == start:
+                    a_prev2, b_prev2 = a_prev1, b_prev1
+                else:
+                    a_prev2, b_prev2 = chain_a[k, i-2], chain_b[k, i-2]
+
+                # Proposal using memory inertia
+                a_prop = a_prev1 + 0.5*(a_prev1 - a_prev2) + noise[k, i, 0]
+                b_prop = b_prev1 + 0.5*(b_prev1 - b_prev2) + noise[k, i, 1]
+
+                loglike_prop = log_likelihood_2d_precomp(a_prop, b_prop, x, y,
+                                                         inv_dy2, model)
+
+                # Tempered Metropolis-Hastings acceptance
+                delta = beta * (loglike_prop - loglikes[k, i-1])
+                if delta >= 0.0 or log_u[k, i] < delta:
+                    chain_a[k, i] = a_prop
+                    chain_b[k, i] = b_prop
+                    loglikes[k, i] = loglike_prop
+                else:
+                    chain_a[k, i] = a_prev1
+                    chain_b[k, i] = b_prev1
+                    loglikes[k, i] = loglikes[k, i-1]
+
+        # Swap proposals between adjacent temperatures
+        j = stop - 1
+        for k in range(n_temps - 1):
+            log_r = (betas[k] - betas[k+1]) * (loglikes[k+1, j] - loglikes[k, j])
+            if log_r >= 0.0 or log_u_swap[n_swap, k] < log_r:
+                chain_a[k, j], chain_a[k+1, j] = chain_a[k+1, j], chain_a[k, j]
+                chain_b[k, j], chain_b[k+1, j] = chain_b[k+1, j], chain_b[k, j]
+                loglikes[k, j], loglikes[k+1, j] = loglikes[k+1, j], loglikes[k, j]
+
+        start = stop
+        n_swap += 1
+
+    return np.column_stack((chain_a[0], chain_b[0])), loglikes[0]
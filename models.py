@@ -0,0 +1,58 @@
+# models.py
+# Model functions for ParamInsight (2D)
+# Four test models: Linear, Logarithmic, Quadratic, Inverse
+# Each model is f(x, a, b) and accepts scalar or array x
+# Models are numba-compiled; integer ids let the compiled (and cached) MCMC
+# kernels call them without taking a function argument (see mcmc.mcmc_2d)
+
+import numpy as np
+from numba import njit
+
+# --------------------------
+# Model ids (see model_value)
+# --------------------------
+
+LINEAR, LOGARITHMIC, QUADRATIC, INVERSE = range(4)
+
+# --------------------------
+# Models
+# --------------------------
+
+@njit(cache=True)
+def linear_model(x, a, b):
+    return a*x + b
+
+@njit(cache=True)
+def log_model(x, a, b):
+    return a * np.log(b*x)
+
+@njit(cache=True)
+def quadratic_model(x, a, b):
+    return a*x + b*x**2
+
+@njit(cache=True)
+def inverse_model(x, a, b):
+    return a/x + b
+
+# --------------------------
+# Compiled dispatch by id
+# --------------------------
+
+# Built-in models dispatched to the compiled MCMC kernels
+MODEL_IDS = {
+    linear_model: LINEAR,
+    log_model: LOGARITHMIC,
+    quadratic_model: QUADRATIC,
+    inverse_model: INVERSE,
+}
+
+@njit(cache=True)
+def model_value(model_id, x, a, b):
+    """Evaluate the built-in model with id model_id (see MODEL_IDS) at x"""
+    if model_id == LINEAR:
+        return linear_model(x, a, b)
+    elif model_id == LOGARITHMIC:
+        return log_model(x, a, b)
+    elif model_id == QUADRATIC:
+        return quadratic_model(x, a, b)
+    return inverse_model(x, a, b)
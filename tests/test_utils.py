@@ -0,0 +1,91 @@
+# test_utils.py
+# Chain I/O round trips and trace decimation
+
+import numpy as np
+import pytest
+
+from utils import save_chain, save_chain_streaming, load_chain, _decimate_trace, _TRACE_MAX_POINTS
+
+
+def _chain(n=10001):
+    rng = np.random.default_rng(1)
+    return rng.normal(size=(n, 2)), rng.normal(size=n)
+
+
+@pytest.mark.parametrize("compress", [None, "zstd", "lz4"])
+def test_save_load_round_trip(tmp_path, compress):
+    if compress == "zstd":
+        pytest.importorskip("zstandard")
+    elif compress == "lz4":
+        pytest.importorskip("lz4")
+    chain, loglikes = _chain()
+    filename = str(tmp_path / "chain.bin")
+
+    save_chain(chain, loglikes, filename, compress=compress)
+    chain_out, loglikes_out = load_chain(filename)
+
+    np.testing.assert_array_equal(chain_out, chain)
+    np.testing.assert_array_equal(loglikes_out, loglikes)
+
+
+def test_save_load_round_trip_npz(tmp_path):
+    chain, loglikes = _chain()
+    filename = str(tmp_path / "chain.npz")
+
+    save_chain(chain, loglikes, filename)
+    chain_out, loglikes_out = load_chain(filename)
+
+    np.testing.assert_array_equal(chain_out, chain)
+    np.testing.assert_array_equal(loglikes_out, loglikes)
+
+
+def test_save_chain_rejects_unknown_compression(tmp_path):
+    chain, loglikes = _chain(10)
+    with pytest.raises(ValueError):
+        save_chain(chain, loglikes, str(tmp_path / "chain.bin"), compress="gzip")
+    assert not (tmp_path / "chain.bin").exists()
+
+
+def test_streaming_matches_save_chain(tmp_path):
+    chain, loglikes = _chain()
+    save_chain(chain, loglikes, str(tmp_path / "a.bin"))
+    # Transposed copy: a non-contiguous view with the same values
+    chain_view = np.array(chain.T).T
+    save_chain_streaming(chain_view, loglikes, str(tmp_path / "b.bin"), chunk_rows=1000)
+
+    assert (tmp_path / "a.bin").read_bytes() == (tmp_path / "b.bin").read_bytes()
+
+
+@pytest.mark.parametrize("compress", ["zstd", "lz4"])
+def test_streaming_compressed_round_trip(tmp_path, compress):
+    pytest.importorskip("zstandard" if compress == "zstd" else "lz4")
+    chain, loglikes = _chain()
+    filename = str(tmp_path / "chain.bin")
+
+    save_chain_streaming(chain, loglikes, filename, chunk_rows=999, compress=compress)
+    chain_out, loglikes_out = load_chain(filename)
+
+    np.testing.assert_array_equal(chain_out, chain)
+    np.testing.assert_array_equal(loglikes_out, loglikes)
+
+
+@pytest.mark.parametrize("n", [10, _TRACE_MAX_POINTS, _TRACE_MAX_POINTS + 1,
+                               5000, 5399, 7199, 10**6 + 7])
+def test_decimate_trace_keeps_extremes_within_cap(n):
+    series = np.random.default_rng(n).normal(size=n)
+    steps, values = _decimate_trace(series)
+
+    assert steps.size <= _TRACE_MAX_POINTS
+    assert np.all(np.diff(steps) >= 0)
+    assert steps[0] >= 0 and steps[-1] < n
+    np.testing.assert_array_equal(values, series[steps])
+    assert values.min() == series.min()
+    assert values.max() == series.max()
+
+
+def test_decimate_trace_short_series_unchanged():
+    series = np.arange(100.0)
+    steps, values = _decimate_trace(series)
+
+    np.testing.assert_array_equal(steps, np.arange(100))
+    np.testing.assert_array_equal(values, series)
@@ -1,43 +1,213 @@
 # utils.py
 """
 Utility functions for ParamInsight
-- Save MCMC chains
+- Save and load MCMC chains
 - Plot trace, histogram, and scatter plots with modern aesthetics
 - Save final results with analysis
 """
 
+import contextlib
 import numpy as np
+from numpy.lib import format as npy_format
+import matplotlib
+matplotlib.use("Agg")  # plots are only saved to files: no GUI backend or event loop
 import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
+from matplotlib.lines import Line2D
 import os
+from numba import njit
 
 # --------------------------
-# Save MCMC chain
+# Save / load MCMC chain
 # --------------------------
-def save_chain(chain, loglikes, filename):
-    """Save MCMC chain and log-likelihoods as a .npz file"""
-    np.savez(filename, chain=chain, loglikes=loglikes)
+
+# Optional compressed chain formats: name -> frame magic bytes
+_CHAIN_CODECS = {"zstd": b"\x28\xb5\x2f\xfd", "lz4": b"\x04\x22\x4d\x18"}
+
+def _chain_stream(f, compress, mode):
+    """Wrap an open binary file in a zstd/lz4 stream (optional packages)"""
+    if compress is None:
+        return contextlib.nullcontext(f)
+    if compress == "zstd":
+        import zstandard
+        if mode == "wb":
+            return zstandard.ZstdCompressor(level=1, threads=-1).stream_writer(f, closefd=False)
+        return zstandard.ZstdDecompressor().stream_reader(f, closefd=False)
+    import lz4.frame
+    return lz4.frame.open(f, mode)
+
+def save_chain(chain, loglikes, filename, compress=None):
+    """
+    Save MCMC chain and log-likelihoods
+    - .npz: NumPy archive with "chain" and "loglikes" entries
+    - any other extension: both arrays as consecutive raw .npy records,
+      written straight from memory without the zip container
+    - compress="zstd" or "lz4" streams the raw records through that
+      compressor (requires the zstandard or lz4 package)
+    """
+    if compress is not None and compress not in _CHAIN_CODECS:
+        raise ValueError(f"Unknown compression {compress!r} (use 'zstd' or 'lz4')")
+
+    if filename.endswith(".npz"):
+        if compress is not None:
+            raise ValueError("compress is not supported for .npz files")
+        np.savez(filename, chain=chain, loglikes=loglikes)
+    else:
+        with open(filename, "wb", buffering=1 << 20) as f, \
+                _chain_stream(f, compress, "wb") as out:
+            npy_format.write_array(out, np.ascontiguousarray(chain), allow_pickle=False)
+            npy_format.write_array(out, np.ascontiguousarray(loglikes), allow_pickle=False)
+    print(f"Chain saved in {filename}")
+
+def save_chain_streaming(chain, loglikes, filename, chunk_rows=1 << 16, compress=None):
+    """
+    Save MCMC chain and log-likelihoods in the raw save_chain format,
+    chunk_rows rows at a time: a non-contiguous chain (e.g. a slice or a
+    transposed view) is never copied whole, so peak memory stays at one
+    block of rows. Read it back with load_chain.
+    """
+    if filename.endswith(".npz"):
+        raise ValueError("save_chain_streaming writes raw records, not .npz files")
+    if compress is not None and compress not in _CHAIN_CODECS:
+        raise ValueError(f"Unknown compression {compress!r} (use 'zstd' or 'lz4')")
+
+    with open(filename, "wb", buffering=1 << 20) as f, \
+            _chain_stream(f, compress, "wb") as out:
+        _write_npy_chunked(out, chain, chunk_rows)
+        _write_npy_chunked(out, loglikes, chunk_rows)
     print(f"Chain saved in {filename}")
 
+def _write_npy_chunked(out, array, chunk_rows):
+    """One .npy record (C order): header, then the data block by block of rows"""
+    array = np.asanyarray(array)
+    header = {"descr": npy_format.dtype_to_descr(array.dtype),
+              "fortran_order": False, "shape": array.shape}
+    npy_format.write_array_header_1_0(out, header)
+    for i in range(0, array.shape[0], chunk_rows):
+        out.write(np.ascontiguousarray(array[i:i + chunk_rows]).data)
+
+def load_chain(filename):
+    """
+    Load MCMC chain and log-likelihoods written by save_chain
+    (the compression, if any, is detected from the file header)
+    """
+    if filename.endswith(".npz"):
+        with np.load(filename) as data:
+            return data["chain"], data["loglikes"]
+    with open(filename, "rb") as f:
+        magic = f.read(4)
+        f.seek(0)
+        compress = next((name for name, m in _CHAIN_CODECS.items() if m == magic), None)
+        with _chain_stream(f, compress, "rb") as src:
+            chain = npy_format.read_array(src, allow_pickle=False)
+            loglikes = npy_format.read_array(src, allow_pickle=False)
+    return chain, loglikes
+
+# --------------------------
+# Output directories
+# --------------------------
+
+# Directories already created by this process
+_ENSURED_DIRS = set()
+
+def _ensure_dir(save_path):
+    """Create the parent directory of save_path once per process"""
+    d = os.path.dirname(save_path)
+    if d and d not in _ENSURED_DIRS:
+        os.makedirs(d, exist_ok=True)
+        _ENSURED_DIRS.add(d)
+
+# --------------------------
+# Figure pool
+# --------------------------
+
+# No toolbar or interactive redraws for the file-only figures
+matplotlib.rcParams["toolbar"] = "None"
+matplotlib.rcParams["interactive"] = False
+
+# One color per parameter (tab10: blue, orange, green, ...), cycled beyond 10
+_PARAM_COLORS = plt.get_cmap("tab10").colors
+
+# Figure/axes pairs reused across plot calls, keyed by figure size
+_FIG_POOL = {}
+
+def _pooled_axes(figsize):
+    """Cleared axes of a pooled figure (created on first use)"""
+    if figsize not in _FIG_POOL:
+        _FIG_POOL[figsize] = plt.subplots(figsize=figsize)
+    fig, ax = _FIG_POOL[figsize]
+    ax.cla()
+    return fig, ax
+
+def _save_figure(fig, save_path):
+    """
+    Save a figure at 150 dpi (tight bounding box not computed)
+    PNGs use zlib level 1 and no Software tag: faster to encode, slightly larger
+    """
+    kwargs = {}
+    if save_path.lower().endswith(".png"):
+        kwargs = dict(metadata={"Software": None}, pil_kwargs={"compress_level": 1})
+    fig.savefig(save_path, dpi=150, bbox_inches=None, **kwargs)
+
 # --------------------------
 # Trace plot
 # --------------------------
+
+# Vertices kept per trace line: two (min, max) per pixel column
+# of the 12-inch, 150 dpi trace figure
+_TRACE_MAX_POINTS = 2 * 12 * 150
+
+def _decimate_trace(series, max_points=_TRACE_MAX_POINTS):
+    """
+    Min/max envelope of a long series: returns (steps, values) with at most
+    max_points vertices, keeping the extremes of every bucket of steps
+    """
+    n = series.size
+    if n <= max_points:
+        return np.arange(n), series
+
+    stride = -(-n // (max_points // 2))  # ceiling: at most max_points // 2 buckets
+    n_buckets = n // stride
+    buckets = series[:n_buckets * stride].reshape(n_buckets, stride)
+    i_min = buckets.argmin(axis=1)
+    i_max = buckets.argmax(axis=1)
+
+    # Min and max of each bucket, in step order, then those of the
+    # leftover partial bucket
+    base = np.arange(n_buckets) * stride
+    steps = np.column_stack((base + np.minimum(i_min, i_max),
+                             base + np.maximum(i_min, i_max))).ravel()
+    tail_start = n_buckets * stride
+    if tail_start < n:
+        tail = series[tail_start:]
+        tail_steps = np.unique([tail.argmin(), tail.argmax()]) + tail_start
+        steps = np.concatenate((steps, tail_steps))
+    return steps, series[steps]
+
 def plot_trace(chain, param_names, save_path):
     """Trace plot for each parameter across MCMC steps"""
-    os.makedirs(os.path.dirname(save_path), exist_ok=True)
+    _ensure_dir(save_path)
+    
+    # One contiguous series per parameter instead of strided columns
+    chain_T = np.ascontiguousarray(chain.T)
     
     plt.style.use("ggplot")
-    plt.figure(figsize=(12,5))
+    fig, ax = _pooled_axes((12,5))
     
-    for i, name in enumerate(param_names):
-        plt.plot(chain[:,i], label=name, linewidth=1.5)
+    # All (decimated) traces as one LineCollection: a single artist to draw
+    segments = [np.column_stack(_decimate_trace(series)) for series in chain_T]
+    colors = [_PARAM_COLORS[i % len(_PARAM_COLORS)] for i in range(len(param_names))]
+    ax.add_collection(LineCollection(segments, colors=colors, linewidths=1.5))
+    ax.autoscale_view()
     
-    plt.xlabel("Step", fontsize=12)
-    plt.ylabel("Parameter value", fontsize=12)
-    plt.title("MCMC Trace", fontsize=14)
-    plt.legend(frameon=True)
-    plt.tight_layout()
-    plt.savefig(save_path, dpi=150)
-    plt.close()
+    ax.set_xlabel("Step", fontsize=12)
+    ax.set_ylabel("Parameter value", fontsize=12)
+    ax.set_title("MCMC Trace", fontsize=14)
+    # Collections have a single legend entry: one proxy line per parameter
+    handles = [Line2D([], [], color=color, linewidth=1.5) for color in colors]
+    ax.legend(handles, param_names, frameon=True)
+    fig.tight_layout()
+    _save_figure(fig, save_path)
     print(f"Trace plot saved in {save_path}")
 
 # --------------------------
@@ -45,58 +215,129 @@ def plot_trace(chain, param_names, save_path):
 # --------------------------
 def plot_histogram(chain, param_names, save_path):
     """Histogram of posterior samples for each parameter"""
-    os.makedirs(os.path.dirname(save_path), exist_ok=True)
+    _ensure_dir(save_path)
     
-    plt.style.use("ggplot")
-    plt.figure(figsize=(8,5))
+    # One contiguous series per parameter instead of strided columns
+    chain_T = np.ascontiguousarray(chain.T)
     
-    colors = ["#1f77b4", "#ff7f0e"]  # blue, orange
+    plt.style.use("ggplot")
+    fig, ax = _pooled_axes((8,5))
     
     for i, name in enumerate(param_names):
-        plt.hist(chain[:,i], bins=30, alpha=0.7, label=name, color=colors[i], edgecolor='black')
+        # Uniform bins over an explicit range, drawn as one step patch
+        # (plt.hist would build one Rectangle artist per bin)
+        x = chain_T[i]
+        counts, edges = np.histogram(x, bins=30, range=(x.min(), x.max()))
+        ax.stairs(counts, edges, fill=True, alpha=0.7, label=name,
+                   facecolor=_PARAM_COLORS[i % len(_PARAM_COLORS)],
+                   edgecolor='black', linewidth=0.5)
+        # Bar separators below the outline, as with per-bar edges
+        ax.vlines(edges[1:-1], 0, np.minimum(counts[:-1], counts[1:]),
+                  colors='black', linewidth=0.5, alpha=0.7)
     
-    plt.xlabel("Parameter value", fontsize=12)
-    plt.ylabel("Frequency", fontsize=12)
-    plt.title("Posterior Distribution", fontsize=14)
-    plt.legend(frameon=True)
-    plt.tight_layout()
-    plt.savefig(save_path, dpi=150)
-    plt.close()
+    ax.set_xlabel("Parameter value", fontsize=12)
+    ax.set_ylabel("Frequency", fontsize=12)
+    ax.set_title("Posterior Distribution", fontsize=14)
+    ax.legend(frameon=True)
+    fig.tight_layout()
+    _save_figure(fig, save_path)
     print(f"Histogram saved in {save_path}")
 
 # --------------------------
 # Scatter plot (a vs b)
 # --------------------------
+
+# Above this many samples the scatter is drawn as a 2D density image
+_SCATTER_MAX_POINTS = 20000
+
 def plot_scatter(chain, param_names, save_path):
-    """Scatter plot showing correlation between parameters"""
-    os.makedirs(os.path.dirname(save_path), exist_ok=True)
+    """
+    Scatter plot showing correlation between parameters
+    (a 2D histogram image for long chains, so render time does not grow with N)
+    """
+    _ensure_dir(save_path)
+    
+    # One contiguous series per parameter instead of strided columns
+    chain_T = np.ascontiguousarray(chain.T)
     
     plt.style.use("ggplot")
-    plt.figure(figsize=(6,6))
+    fig, ax = _pooled_axes((6,6))
     
-    plt.scatter(chain[:,0], chain[:,1], s=20, alpha=0.6, color="#2ca02c")
-    plt.xlabel(param_names[0], fontsize=12)
-    plt.ylabel(param_names[1], fontsize=12)
-    plt.title("Parameter Correlation", fontsize=14)
-    plt.tight_layout()
-    plt.savefig(save_path, dpi=150)
-    plt.close()
+    if chain_T.shape[1] <= _SCATTER_MAX_POINTS:
+        ax.scatter(chain_T[0], chain_T[1], s=20, alpha=0.6, color="#2ca02c")
+    else:
+        x_range = (chain_T[0].min(), chain_T[0].max())
+        y_range = (chain_T[1].min(), chain_T[1].max())
+        H, _, _ = np.histogram2d(chain_T[0], chain_T[1], bins=256, range=(x_range, y_range))
+        ax.imshow(np.log1p(H.T), origin="lower", extent=(*x_range, *y_range),
+                   cmap="Greens", aspect="auto", interpolation="nearest")
+        ax.grid(False)
+    ax.set_xlabel(param_names[0], fontsize=12)
+    ax.set_ylabel(param_names[1], fontsize=12)
+    ax.set_title("Parameter Correlation", fontsize=14)
+    fig.tight_layout()
+    _save_figure(fig, save_path)
     print(f"Scatter plot saved in {save_path}")
 
 # --------------------------
 # Save final results
 # --------------------------
+def posterior_moments(chain):
+    """
+    Mean and std of every parameter (chain columns): two unit-stride passes
+    over each parameter series (sum, then squared deviations from the mean)
+    """
+    # One contiguous series per parameter instead of strided columns
+    chain_T = np.ascontiguousarray(np.asarray(chain, dtype=np.float64).T)
+    return _moments(chain_T)
+
+@njit(cache=True, fastmath={"reassoc", "contract"})
+def _moments(chain_T):
+    """Compiled kernel of posterior_moments"""
+    n_params, n = chain_T.shape
+    mean = np.empty(n_params)
+    std = np.empty(n_params)
+    for j in range(n_params):
+        series = chain_T[j]
+        s = 0.0
+        for i in range(n):
+            s += series[i]
+        mu = s / n
+
+        ss = 0.0
+        for i in range(n):
+            d = series[i] - mu
+            ss += d * d
+        mean[j] = mu
+        std[j] = np.sqrt(ss / n)
+    return mean, std
+
 def save_final_results(chain, param_names, save_path):
     """
     Save mean ± std for each parameter in a text file
     """
-    os.makedirs(os.path.dirname(save_path), exist_ok=True)
+    _ensure_dir(save_path)
     
+    means, stds = posterior_moments(chain)
+    # Whole file body built in memory and written at once
+    lines = ["Final estimated parameters:"]
+    lines += ["%s: %.4f ± %.4f" % (name, mean, std)
+              for name, mean, std in zip(param_names, means, stds)]
     with open(save_path, "w") as f:
-        f.write("Final estimated parameters:\n")
-        for i, name in enumerate(param_names):
-            mean = np.mean(chain[:,i])
-            std = np.std(chain[:,i])
-            f.write(f"{name}: {mean:.4f} ± {std:.4f}\n")
+        f.write("\n".join(lines) + "\n")
     
     print(f"Final results saved in {save_path}")
+
+# --------------------------
+# Full report
+# --------------------------
+def render_report(chain, param_names, outdir):
+    """
+    Trace, histogram and scatter plots plus final results for one chain,
+    written to outdir (rendered in this process: the plots are decimated
+    or binned, so their cost barely grows with the chain length)
+    """
+    plot_trace(chain, param_names, f"{outdir}/trace.png")
+    plot_histogram(chain, param_names, f"{outdir}/histogram.png")
+    plot_scatter(chain, param_names, f"{outdir}/scatter.png")
+    save_final_results(chain, param_names, f"{outdir}/final_results.txt")